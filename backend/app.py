@@ -1,18 +1,25 @@
 # backend/app.py
-from flask import Flask, request, jsonify, send_from_directory, session
+from flask import Flask, request, jsonify, send_from_directory, session, Response
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import (
+    JWTManager, create_access_token, jwt_required, get_jwt_identity,
+    verify_jwt_in_request
+)
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import os
 import time
 import base64
 import io
+import asyncio
 import logging
+import queue
+import threading
 import uuid
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageOps
 try:
     import cv2
     import numpy as np
@@ -21,7 +28,6 @@ except ImportError:
     CV2_AVAILABLE = False
 # Importar módulos locales
 import sys
-import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
@@ -30,13 +36,47 @@ try:
 except ImportError:
     STRUCTLOG_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+
+    class ProcessOCRRequest(msgspec.Struct):
+        """Esquema del cuerpo de /api/process-ocr (validación en C)"""
+        image_data: str = ''
+        language: str = 'es'
+        document_type: str = 'general'
+        use_cache: bool = True
+        digits_only: bool = False
+        brightness: int = 0
+        contrast: int = 100
+        sharpness: int = 0
+        engine: int = 2
+        session_id: str = ''
+        use_cv_preprocess: bool = True
+
+    _ocr_request_decoder = msgspec.json.Decoder(ProcessOCRRequest)
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
 from database import db_manager
+from ocr_space_client import OCRSpaceClient
 
-# Configurar logging estructurado
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configurar logging estructurado (sólo si nadie lo configuró antes,
+# para no registrar handlers duplicados al reimportar el módulo)
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+# PIL registra cada plugin de imagen en DEBUG/INFO; silenciar su ruido
+logging.getLogger('PIL').setLevel(logging.WARNING)
 
 # Crear un wrapper para el logger que maneja ambos casos
 class LoggerWrapper:
@@ -92,12 +132,39 @@ except ImportError as e:
     logger.info("Usando modo legacy sin procesador modular")
 
 app = Flask(__name__, static_folder='static')
+
+# Proveedor JSON basado en orjson (serialización C/SIMD).
+# Acelera el parseo de payloads grandes como el base64 de /api/process-ocr
+if ORJSON_AVAILABLE:
+    from flask.json.provider import JSONProvider
+
+    class OrjsonProvider(JSONProvider):
+        """JSON provider que usa orjson en lugar del módulo json estándar"""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+    logger.info("orjson habilitado como proveedor JSON")
+else:
+    logger.info("orjson no disponible, usando json estándar")
+
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'ocr-odoo-secret-key-change-in-production')
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-change-in-production')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 
 # Extensiones
-CORS(app, origins="*", methods=["GET", "POST", "OPTIONS"], allow_headers=["Content-Type", "Authorization"])
+# CORS sólo sobre /api/*: los assets estáticos son same-origin y no
+# necesitan pasar por el after_request de flask_cors
+CORS(
+    app,
+    resources={r"/api/*": {"origins": "*"}},
+    methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Content-Type", "Authorization"]
+)
 jwt = JWTManager(app)
 
 # Rate limiting
@@ -112,6 +179,57 @@ limiter.init_app(app)
 logger.info("Base de datos inicializada")
 logger.info("Procesador OCR modular inicializado")
 
+# Pool de workers para los pipelines OCR: desacopla el trabajo pesado del
+# hilo que atiende la petición y acota cuántos OCR corren en paralelo
+OCR_EXECUTOR = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 2,
+    thread_name_prefix='ocr-worker'
+)
+OCR_JOB_TIMEOUT = int(os.environ.get('OCR_JOB_TIMEOUT', 120))
+
+# Lado máximo de imagen que entra al pipeline; las fotos de cámara de 12MP+
+# se reducen antes de procesar (el coste de OCR crece con los píxeles)
+MAX_IMAGE_DIMENSION = int(os.environ.get('MAX_IMAGE_DIMENSION', 2200))
+
+# Tope de píxeles aceptados ANTES de decodificar: Image.open es perezoso y
+# las dimensiones salen de la cabecera, así que un PNG de 20000x20000 se
+# rechaza sin asignar el gigabyte largo que costaría decodificarlo
+MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 50_000_000))
+
+def _check_image_pixels(image: Image.Image):
+    """Rechazar imágenes descomunales leyendo sólo la cabecera"""
+    if image.width * image.height > MAX_IMAGE_PIXELS:
+        raise ValueError(
+            f'Imagen demasiado grande: {image.width}x{image.height} '
+            f'(máximo {MAX_IMAGE_PIXELS} píxeles)'
+        )
+
+# Cola de logs del frontend: el handler sólo encola y responde,
+# un hilo daemon escribe al logger (y su lock) fuera del request path
+_frontend_log_queue = queue.SimpleQueue()
+
+def _drain_frontend_logs():
+    """Volcar logs del frontend encolados al logger en segundo plano"""
+    while True:
+        level, message, extra_data = _frontend_log_queue.get()
+        if level == 'ERROR':
+            logger.error(message)
+        elif level == 'WARN':
+            logger.warning(message)
+        elif level == 'DEBUG':
+            logger.debug(message)
+        else:
+            logger.info(message)
+
+        if extra_data:
+            logger.info(f"[FRONTEND-DATA] {extra_data}")
+
+threading.Thread(
+    target=_drain_frontend_logs,
+    name='frontend-log-drain',
+    daemon=True
+).start()
+
 # Las funciones de procesamiento se han movido a módulos especializados
 # Ver src/core/ para preprocesamiento, OCR y post-procesamiento
 
@@ -119,7 +237,9 @@ logger.info("Procesador OCR modular inicializado")
 def index():
     """Servir el frontend Vue.js"""
     if os.path.exists('static/index.html'):
-        return send_from_directory('static', 'index.html')
+        # conditional=True habilita respuestas 304 vía ETag y permite al
+        # servidor WSGI usar sendfile a través de wsgi.file_wrapper
+        return send_from_directory('static', 'index.html', conditional=True)
     return "Frontend not found. Please build Vue.js first.", 404
 
 @app.route('/<path:filename>')
@@ -137,7 +257,10 @@ def serve_frontend_files(filename):
             file_ext = os.path.splitext(filename)[1].lower()
             
             if file_ext in allowed_extensions or not file_ext:  # Archivos sin extensión para Vue Router
-                return send_from_directory('static', filename)
+                # Los bundles llevan hash en el nombre: cachear 1h y dejar
+                # que los 304 condicionales cubran las recargas
+                return send_from_directory('static', filename,
+                                           conditional=True, max_age=3600)
             else:
                 return "Tipo de archivo no permitido", 403
         except Exception as e:
@@ -145,7 +268,7 @@ def serve_frontend_files(filename):
     
     # Para Vue Router - siempre devolver index.html para rutas no encontradas
     try:
-        return send_from_directory('static', 'index.html')
+        return send_from_directory('static', 'index.html', conditional=True)
     except Exception as e:
         return f"Error sirviendo archivo: {e}", 404
 
@@ -276,7 +399,6 @@ def export_data():
         data = db_manager.export_data(format_type, user_id)
         
         if format_type == 'csv':
-            from flask import Response
             return Response(
                 data,
                 mimetype='text/csv',
@@ -297,6 +419,28 @@ def export_data():
 
 # ============ OCR PROCESSING ============
 
+def _parse_ocr_request() -> dict:
+    """Extraer y validar el cuerpo JSON de /api/process-ocr"""
+    if MSGSPEC_AVAILABLE:
+        # msgspec decodifica y valida tipos directamente en C
+        parsed = _ocr_request_decoder.decode(request.get_data(cache=False))
+        return {field: getattr(parsed, field) for field in parsed.__struct_fields__}
+
+    data = request.json or {}
+    return {
+        'image_data': data.get('image_data', ''),
+        'language': data.get('language', 'es'),
+        'document_type': data.get('document_type', 'general'),
+        'use_cache': data.get('use_cache', True),
+        'digits_only': data.get('digits_only', False),
+        'brightness': data.get('brightness', 0),
+        'contrast': data.get('contrast', 100),
+        'sharpness': data.get('sharpness', 0),
+        'engine': data.get('engine', 2),
+        'session_id': data.get('session_id', ''),
+        'use_cv_preprocess': data.get('use_cv_preprocess', True),
+    }
+
 @app.route('/api/process-ocr', methods=['POST'])
 @limiter.limit("10 per minute")
 def process_ocr():
@@ -304,35 +448,47 @@ def process_ocr():
     start_time = time.time()
     
     try:
-        data = request.json
-        if not data or 'image_data' not in data:
+        try:
+            data = _parse_ocr_request()
+        except Exception as parse_error:
+            return jsonify({
+                'success': False,
+                'message': f'Cuerpo de petición inválido: {parse_error}'
+            }), 400
+
+        if not data['image_data']:
             return jsonify({
                 'success': False,
                 'message': 'No se proporcionó imagen'
             }), 400
-        
+
         # Obtener usuario (puede ser opcional para sesiones anónimas)
         user_id = None
         try:
-            from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
             verify_jwt_in_request(optional=True)
             user_id = get_jwt_identity() or 'anonymous'
         except:
             user_id = 'anonymous'
         
         # Obtener parámetros
-        language = data.get('language', 'es')
-        document_type = data.get('document_type', 'general')
-        use_cache = data.get('use_cache', True)
-        digits_only = data.get('digits_only', False)
-        
+        language = data['language']
+        document_type = data['document_type']
+        use_cache = data['use_cache']
+        digits_only = data['digits_only']
+
         # Parámetros de preprocesamiento
         preprocessing_params = {
-            'brightness': data.get('brightness', 0),
-            'contrast': data.get('contrast', 100),
-            'sharpness': data.get('sharpness', 0)
+            'brightness': data['brightness'],
+            'contrast': data['contrast'],
+            'sharpness': data['sharpness']
         }
-        
+
+        # Clientes que envían imágenes ya limpias pueden saltarse el
+        # filtrado OpenCV (denoise + binarización) y dejar que el motor
+        # OCR trabaje sobre el gris original
+        if not data['use_cv_preprocess']:
+            preprocessing_params.update({'denoise': False, 'binarize': False})
+
         logger.info("Iniciando pipeline OCR modular", 
                    user_id=user_id, 
                    language=language,
@@ -342,16 +498,36 @@ def process_ocr():
         # Decodificar imagen base64
         try:
             image_data_url = data['image_data']
-            if ',' in image_data_url:
-                image_data = base64.b64decode(image_data_url.split(',')[1])
-            else:
-                image_data = base64.b64decode(image_data_url)
+            # Saltar el prefijo "data:...;base64," con un slice en lugar de
+            # split(',') para no copiar el payload completo dos veces
+            comma_pos = image_data_url.find(',')
+            if comma_pos != -1:
+                image_data_url = image_data_url[comma_pos + 1:]
+            image_data = base64.b64decode(image_data_url)
             
             # Cargar imagen
             image = Image.open(io.BytesIO(image_data))
-            
-            logger.info("Imagen cargada", 
-                       size=image.size, 
+            _check_image_pixels(image)
+
+            # Para JPEG, pedir a libjpeg que decodifique ya a escala DCT
+            # reducida y directamente en escala de grises: todo el pipeline
+            # (preprocesador y proveedores) trabaja en gris, así que el
+            # croma se descartaría de todos modos (no-op para otros formatos)
+            image.draft('L', (MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+
+            # Reducir imágenes sobredimensionadas antes de todo el pipeline
+            if max(image.size) > MAX_IMAGE_DIMENSION:
+                original_size = image.size
+                image.thumbnail(
+                    (MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION),
+                    Image.Resampling.LANCZOS
+                )
+                logger.info("Imagen reducida para OCR",
+                           original_size=original_size,
+                           new_size=image.size)
+
+            logger.info("Imagen cargada",
+                       size=image.size,
                        size_kb=len(image_data) // 1024)
             
         except Exception as img_error:
@@ -363,28 +539,20 @@ def process_ocr():
         
         # Procesar según disponibilidad del sistema modular
         if OCR_PROCESSOR_AVAILABLE:
-            # Usar pipeline modular
-            import asyncio
-            try:
-                # Crear un nuevo event loop si no existe
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
-            result = loop.run_until_complete(ocr_processor.process_image(
+            # Usar pipeline modular ejecutado en el pool de workers;
+            # cada job corre su propio event loop vía asyncio.run()
+            future = OCR_EXECUTOR.submit(asyncio.run, ocr_processor.process_image(
                 image=image,
                 language=language,
                 document_type=document_type,
                 preprocessing_params=preprocessing_params,
                 use_cache=use_cache,
-                engine=data.get('engine', 2),
+                engine=data['engine'],
                 digits_only=digits_only
             ))
+            result = future.result(timeout=OCR_JOB_TIMEOUT)
         else:
             # Fallback a procesamiento legacy simplificado
-            from ocr_space_client import OCRSpaceClient
-            
             # Usar cliente OCR.Space legacy
             ocr_client = OCRSpaceClient()
             
@@ -412,7 +580,7 @@ def process_ocr():
         # Crear job en base de datos
         job_id = db_manager.create_ocr_job(
             user_id=user_id,
-            session_id=data.get('session_id', str(uuid.uuid4())),
+            session_id=data['session_id'] or str(uuid.uuid4()),
             image_data=image_data,
             image_dimensions=list(image.size),
             preprocessing_params=preprocessing_params,
@@ -420,7 +588,7 @@ def process_ocr():
             confidence=result['confidence'],
             processing_time=result['processing_time'],
             ocr_provider=result.get('details', {}).get('ocr_provider', 'unknown'),
-            ocr_engine=f"engine_{data.get('engine', 2)}",
+            ocr_engine=f"engine_{data['engine']}",
             success=result['success'],
             error_message=result.get('error_message')
         )
@@ -456,7 +624,7 @@ def process_ocr():
             if 'user_id' in locals() and 'image_data' in locals():
                 error_job_id = db_manager.create_ocr_job(
                     user_id=user_id,
-                    session_id=data.get('session_id', str(uuid.uuid4())),
+                    session_id=data['session_id'] or str(uuid.uuid4()),
                     image_data=image_data,
                     success=False,
                     error_message=str(e),
@@ -480,6 +648,272 @@ def process_ocr():
             'message': f'Error interno del servidor: {str(e)}'
         }), 500
 
+@app.route('/api/process-ocr-batch', methods=['POST'])
+@limiter.limit("2 per minute")
+def process_ocr_batch():
+    """Procesar varias imágenes en paralelo sobre el pool de workers
+
+    Todas las imágenes se envían al executor antes de esperar ningún
+    resultado: el preprocesamiento (CPU) de unas solapa con la espera de
+    red de OCR.Space de otras, en lugar de encadenarlas en serie.
+    """
+    start_time = time.time()
+
+    if not OCR_PROCESSOR_AVAILABLE:
+        return jsonify({
+            'success': False,
+            'message': 'Procesamiento por lotes no disponible sin el pipeline modular'
+        }), 503
+
+    try:
+        data = request.json or {}
+        images = data.get('images')
+        if not images or not isinstance(images, list):
+            return jsonify({
+                'success': False,
+                'message': 'Se requiere una lista "images" con imágenes base64'
+            }), 400
+
+        max_batch = int(os.environ.get('OCR_MAX_BATCH_SIZE', 10))
+        if len(images) > max_batch:
+            return jsonify({
+                'success': False,
+                'message': f'Máximo {max_batch} imágenes por lote'
+            }), 400
+
+        user_id = None
+        try:
+            verify_jwt_in_request(optional=True)
+            user_id = get_jwt_identity() or 'anonymous'
+        except:
+            user_id = 'anonymous'
+
+        language = data.get('language', 'es')
+        document_type = data.get('document_type', 'general')
+        use_cache = data.get('use_cache', True)
+        digits_only = data.get('digits_only', False)
+        session_id = data.get('session_id') or str(uuid.uuid4())
+        preprocessing_params = {
+            'brightness': data.get('brightness', 0),
+            'contrast': data.get('contrast', 100),
+            'sharpness': data.get('sharpness', 0)
+        }
+        if not data.get('use_cv_preprocess', True):
+            preprocessing_params.update({'denoise': False, 'binarize': False})
+
+        # Decodificar y encolar todas las imágenes primero
+        jobs = []
+        for index, image_data_url in enumerate(images):
+            try:
+                comma_pos = image_data_url.find(',')
+                if comma_pos != -1:
+                    image_data_url = image_data_url[comma_pos + 1:]
+                image_data = base64.b64decode(image_data_url)
+                image = Image.open(io.BytesIO(image_data))
+                _check_image_pixels(image)
+                image.draft('L', (MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+                if max(image.size) > MAX_IMAGE_DIMENSION:
+                    image.thumbnail(
+                        (MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION),
+                        Image.Resampling.LANCZOS
+                    )
+            except Exception as img_error:
+                jobs.append((index, None, None, str(img_error)))
+                continue
+
+            future = OCR_EXECUTOR.submit(asyncio.run, ocr_processor.process_image(
+                image=image,
+                language=language,
+                document_type=document_type,
+                preprocessing_params=preprocessing_params,
+                use_cache=use_cache,
+                engine=data.get('engine', 2),
+                digits_only=digits_only
+            ))
+            jobs.append((index, future, (image, image_data), None))
+
+        # Recoger resultados y persistir cada job como en /api/process-ocr
+        results = []
+        for index, future, decoded, decode_error in jobs:
+            if future is None:
+                results.append({
+                    'index': index,
+                    'success': False,
+                    'text': '',
+                    'confidence': 0,
+                    'error_message': f'Error al procesar imagen: {decode_error}'
+                })
+                continue
+
+            image, image_data = decoded
+            try:
+                result = future.result(timeout=OCR_JOB_TIMEOUT)
+            except Exception as job_error:
+                results.append({
+                    'index': index,
+                    'success': False,
+                    'text': '',
+                    'confidence': 0,
+                    'error_message': str(job_error)
+                })
+                continue
+
+            # Un fallo de persistencia (p.ej. imagen duplicada en el lote)
+            # no debe tumbar el lote completo: el resultado OCR ya existe
+            try:
+                job_id = db_manager.create_ocr_job(
+                    user_id=user_id,
+                    session_id=session_id,
+                    image_data=image_data,
+                    image_dimensions=list(image.size),
+                    preprocessing_params=preprocessing_params,
+                    extracted_text=result['text'],
+                    confidence=result['confidence'],
+                    processing_time=result['processing_time'],
+                    ocr_provider=result.get('details', {}).get('ocr_provider', 'unknown'),
+                    ocr_engine=f"engine_{data.get('engine', 2)}",
+                    success=result['success'],
+                    error_message=result.get('error_message')
+                )
+            except Exception as db_error:
+                logger.warning("Error guardando job del lote",
+                              index=index,
+                              error=str(db_error))
+                job_id = None
+            results.append({**result, 'index': index, 'job_id': job_id})
+
+        total_time = time.time() - start_time
+        successful = sum(1 for r in results if r.get('success'))
+        logger.info("Lote OCR completado",
+                   user_id=user_id,
+                   batch_size=len(images),
+                   successful=successful,
+                   total_time=total_time)
+
+        return jsonify({
+            'success': successful > 0,
+            'results': results,
+            'batch_size': len(images),
+            'successful': successful,
+            'processing_time': total_time,
+            'user_id': user_id
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error interno del servidor: {str(e)}',
+            'processing_time': time.time() - start_time
+        }), 500
+
+@app.route('/api/process-ocr-binary', methods=['POST'])
+@limiter.limit("10 per minute")
+def process_ocr_binary():
+    """Procesar una imagen subida como binario puro (sin base64)
+
+    Evita el 33% de sobrecoste de base64 y el b64decode por petición.
+    Acepta multipart/form-data (campo "image") o el cuerpo crudo; las
+    opciones van como query string (language, document_type, etc.).
+    """
+    start_time = time.time()
+
+    if not OCR_PROCESSOR_AVAILABLE:
+        return jsonify({
+            'success': False,
+            'message': 'Endpoint binario no disponible sin el pipeline modular'
+        }), 503
+
+    try:
+        if 'image' in request.files:
+            image_data = request.files['image'].read()
+        else:
+            image_data = request.get_data(cache=False, parse_form_data=False)
+
+        if not image_data:
+            return jsonify({
+                'success': False,
+                'message': 'No se proporcionó imagen'
+            }), 400
+
+        user_id = None
+        try:
+            verify_jwt_in_request(optional=True)
+            user_id = get_jwt_identity() or 'anonymous'
+        except:
+            user_id = 'anonymous'
+
+        args = request.args
+        language = args.get('language', 'es')
+        document_type = args.get('document_type', 'general')
+        use_cache = args.get('use_cache', 'true').lower() != 'false'
+        digits_only = args.get('digits_only', 'false').lower() == 'true'
+        preprocessing_params = {
+            'brightness': args.get('brightness', 0, type=int),
+            'contrast': args.get('contrast', 100, type=int),
+            'sharpness': args.get('sharpness', 0, type=int)
+        }
+        if args.get('use_cv_preprocess', 'true').lower() == 'false':
+            preprocessing_params.update({'denoise': False, 'binarize': False})
+
+        try:
+            image = Image.open(io.BytesIO(image_data))
+            _check_image_pixels(image)
+            image.draft('L', (MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+            if max(image.size) > MAX_IMAGE_DIMENSION:
+                image.thumbnail(
+                    (MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION),
+                    Image.Resampling.LANCZOS
+                )
+        except Exception as img_error:
+            return jsonify({
+                'success': False,
+                'message': f'Error al procesar imagen: {img_error}'
+            }), 400
+
+        future = OCR_EXECUTOR.submit(asyncio.run, ocr_processor.process_image(
+            image=image,
+            language=language,
+            document_type=document_type,
+            preprocessing_params=preprocessing_params,
+            use_cache=use_cache,
+            engine=args.get('engine', 2, type=int),
+            digits_only=digits_only
+        ))
+        result = future.result(timeout=OCR_JOB_TIMEOUT)
+
+        job_id = db_manager.create_ocr_job(
+            user_id=user_id,
+            session_id=args.get('session_id') or str(uuid.uuid4()),
+            image_data=image_data,
+            image_dimensions=list(image.size),
+            preprocessing_params=preprocessing_params,
+            extracted_text=result['text'],
+            confidence=result['confidence'],
+            processing_time=result['processing_time'],
+            ocr_provider=result.get('details', {}).get('ocr_provider', 'unknown'),
+            ocr_engine=f"engine_{args.get('engine', 2, type=int)}",
+            success=result['success'],
+            error_message=result.get('error_message')
+        )
+
+        return jsonify({
+            **result,
+            'job_id': job_id,
+            'user_id': user_id,
+            'language': language,
+            'document_type': document_type
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'text': '',
+            'confidence': 0,
+            'processing_time': time.time() - start_time,
+            'error_message': str(e),
+            'message': f'Error interno del servidor: {str(e)}'
+        }), 500
+
 @app.route('/api/test-connection', methods=['POST'])
 def test_connection_api():
     """Probar conexión y capacidades del sistema modular"""
@@ -522,7 +956,6 @@ def test_connection_api():
         try:
             test_img = Image.new('RGB', (200, 100), color='white')
             # Agregar texto simple para test
-            from PIL import ImageDraw
             draw = ImageDraw.Draw(test_img)
             draw.text((10, 40), "TEST", fill='black')
             
@@ -553,33 +986,21 @@ def test_connection_api():
 
 @app.route('/api/frontend-log', methods=['POST'])
 def frontend_log():
-    """Recibir y procesar logs del frontend"""
+    """Recibir logs del frontend (se escriben en segundo plano)"""
     try:
         data = request.json
         log_level = data.get('level', 'INFO').upper()
         message = data.get('message', '')
         timestamp = data.get('timestamp', '')
-        additional_data = data.get('data', {})
-        
+
         # Formatear mensaje
         log_message = f"[FRONTEND-{log_level}] {message}"
         if timestamp:
             log_message = f"[{timestamp}] {log_message}"
-        
-        # Log según nivel
-        if log_level == 'ERROR':
-            logger.error(log_message)
-        elif log_level == 'WARN':
-            logger.warning(log_message)
-        elif log_level == 'DEBUG':
-            logger.debug(log_message)
-        else:
-            logger.info(log_message)
-        
-        # Datos adicionales
-        if additional_data:
-            logger.info(f"[FRONTEND-DATA] {additional_data}")
-        
+
+        # Encolar y responder: el hilo de drenaje hace el I/O de logging
+        _frontend_log_queue.put((log_level, log_message, data.get('data', {})))
+
         return jsonify({'success': True})
         
     except Exception as e:
@@ -706,4 +1127,13 @@ if __name__ == '__main__':
         print(f"  {rule.rule} -> {rule.endpoint} [{', '.join(rule.methods)}]")
     print("=====================================")
     
-    app.run(debug=False, host='0.0.0.0', port=port)
\ No newline at end of file
+    # Ejecución directa sólo para desarrollo: threaded=True permite solapar
+    # peticiones (las llamadas a OCR.Space son espera de red); el debugger
+    # se activa únicamente vía FLASK_DEBUG=1. En producción el punto de
+    # entrada es gunicorn (ver gunicorn.conf.py)
+    app.run(
+        debug=os.environ.get('FLASK_DEBUG') == '1',
+        threaded=True,
+        host='0.0.0.0',
+        port=port
+    )
\ No newline at end of file
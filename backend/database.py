@@ -135,9 +135,34 @@ class DatabaseManager:
                 VALUES ({', '.join(placeholders)})
             '''
             
-            cursor.execute(query, values)
+            try:
+                cursor.execute(query, values)
+            except sqlite3.IntegrityError:
+                # La imagen ya fue procesada antes (image_hash es UNIQUE):
+                # reutilizar la fila existente y refrescarla con el resultado
+                # más reciente en lugar de fallar la petición
+                if 'image_hash' not in kwargs:
+                    raise
+                cursor.execute(
+                    'SELECT id FROM ocr_jobs WHERE image_hash = ?',
+                    (kwargs['image_hash'],)
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    raise
+                job_id = row['id']
+                update_kwargs = {k: v for k, v in kwargs.items() if k != 'image_hash'}
+                update_kwargs['updated_at'] = datetime.now().isoformat()
+                set_clauses = [f"{column} = ?" for column in update_kwargs.keys()]
+                cursor.execute(
+                    f"UPDATE ocr_jobs SET {', '.join(set_clauses)} WHERE id = ?",
+                    list(update_kwargs.values()) + [job_id]
+                )
+                logger.info(f"♻️ Imagen duplicada: OCR job {job_id} reutilizado")
+                return job_id
+
             job_id = cursor.lastrowid
-            
+
             logger.info(f"✅ OCR job creado con ID: {job_id}")
             return job_id
     
@@ -0,0 +1,23 @@
+# backend/gunicorn.conf.py
+# Configuración de Gunicorn para producción:
+#   gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Workers con hilos: los handlers de OCR bloquean en red/subprocesos,
+# así que varios hilos por worker mantienen el servidor respondiendo
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Keep-alive para que los clientes reutilicen conexiones
+keepalive = 5
+
+# Los jobs OCR pueden tardar (reintentos de OCR.Space con backoff)
+timeout = 180
+
+# Con varios workers/hilos procesando OCR en paralelo, las librerías
+# con OpenMP (OpenCV, Tesseract) no deben multiplicar hilos por núcleo:
+# la paralelización ya ocurre a nivel de petición
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
@@ -11,7 +11,9 @@ class OdooClient:
     def __init__(self, config_path='../config/credentials.json'):
         self.config_path = config_path
         self.config = self.load_config()
-    
+        self._proxies = {}  # ServerProxy persistente por (url, servicio)
+        self._uids = {}     # uid autenticado cacheado por instancia
+
     def load_config(self):
         """Cargar configuración desde archivo JSON"""
         try:
@@ -71,37 +73,57 @@ class OdooClient:
         """Obtener configuración de una instancia específica"""
         return self.config.get("odoo_instances", {}).get(instance_name)
     
+    def _get_proxy(self, url, service):
+        """Obtener un ServerProxy persistente por URL y servicio.
+
+        xmlrpc.client reutiliza la conexión HTTP (keep-alive) mientras viva
+        el transporte, así que cachear el proxy evita abrir una conexión
+        TCP nueva en cada petición.
+        """
+        key = (url, service)
+        proxy = self._proxies.get(key)
+        if proxy is None:
+            proxy = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/{service}')
+            self._proxies[key] = proxy
+        return proxy
+
     def authenticate(self, instance_name='production'):
-        """Autenticar con Odoo"""
+        """Autenticar con Odoo (el uid se cachea por instancia)"""
+        uid = self._uids.get(instance_name)
+        if uid:
+            return uid
+
         config = self.get_instance_config(instance_name)
         if not config:
             logger.error(f"Configuración no encontrada para instancia: {instance_name}")
             return None
-        
+
         try:
-            common = xmlrpc.client.ServerProxy(f'{config["url"]}/xmlrpc/2/common')
+            common = self._get_proxy(config["url"], 'common')
             uid = common.authenticate(
                 config["database"],
                 config["username"],
                 config["password"],
                 {}
             )
+            if uid:
+                self._uids[instance_name] = uid
             logger.info(f"Autenticación exitosa para instancia {instance_name}, UID: {uid}")
             return uid
         except Exception as e:
             logger.error(f"Error de autenticación en {instance_name}: {e}")
             return None
-    
+
     def create_record(self, model, data, instance_name='production'):
         """Crear un registro en Odoo"""
         config = self.get_instance_config(instance_name)
         uid = self.authenticate(instance_name)
-        
+
         if not uid or not config:
             return None
-        
+
         try:
-            models = xmlrpc.client.ServerProxy(f'{config["url"]}/xmlrpc/2/object')
+            models = self._get_proxy(config["url"], 'object')
             record_id = models.execute_kw(
                 config["database"],
                 uid,
@@ -113,6 +135,10 @@ class OdooClient:
             logger.info(f"Registro creado exitosamente: {record_id} en modelo {model}")
             return record_id
         except Exception as e:
+            # Invalidar credenciales y conexión cacheadas por si la sesión
+            # expiró o el servidor cerró el socket
+            self._uids.pop(instance_name, None)
+            self._proxies.pop((config["url"], 'object'), None)
             logger.error(f"Error creando registro en {model}: {e}")
             return None
     
@@ -3,11 +3,15 @@
 Procesador principal de OCR que coordina preprocesamiento, OCR y post-procesamiento
 """
 
+import asyncio
 import time
+import io
 import logging
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List
 from PIL import Image
 import hashlib
+import numpy as np
 
 from .image_preprocessor import image_preprocessor
 from .text_postprocessor import text_postprocessor
@@ -22,7 +26,8 @@ class OCRProcessor:
     
     def __init__(self):
         self.orchestrator = ocr_orchestrator
-        self.cache = {}  # Cache simple en memoria
+        self.cache = OrderedDict()  # Cache LRU en memoria
+        self.cache_max_size = 100
         self.stats = {
             'total_processed': 0,
             'cache_hits': 0,
@@ -86,16 +91,25 @@ class OCRProcessor:
             # 1. Calcular hash de imagen para cache
             image_hash = self._calculate_image_hash(image)
             pipeline_log.append(f"📊 Hash calculado: {image_hash[:16]}")
-            
+
+            # La clave incluye las opciones de procesamiento: la misma imagen
+            # con otro idioma/tipo/motor/parámetros produce otro resultado
+            cache_key = (
+                image_hash, language, document_type, digits_only,
+                kwargs.get('engine'),
+                tuple(sorted(preprocessing_params.items())) if preprocessing_params else None
+            )
+
             # 2. Verificar cache
-            if use_cache and image_hash in self.cache:
+            if use_cache and cache_key in self.cache:
                 self.stats['cache_hits'] += 1
-                cached_result = self.cache[image_hash].copy()
+                self.cache.move_to_end(cache_key)  # Marcar como usado recientemente
+                cached_result = self.cache[cache_key].copy()
                 cached_result['cached'] = True
                 cached_result['processing_time'] = time.time() - start_time
                 pipeline_log.append("🎯 Resultado obtenido del cache")
-                
-                logger.info("Cache hit para imagen", image_hash=image_hash[:16])
+
+                logger.info("Cache hit para imagen: %s", image_hash[:16])
                 return cached_result
             
             # 3. Preprocesamiento de imagen
@@ -105,19 +119,34 @@ class OCRProcessor:
             # Usar parámetros específicos o detectar automáticamente
             if preprocessing_params is None:
                 preprocessing_params = self._detect_optimal_preprocessing(image, document_type)
-            
-            processed_image = image_preprocessor.optimize_for_ocr(image, document_type)
-            if preprocessing_params:
-                processed_image = image_preprocessor.preprocess_advanced(
-                    processed_image, 
-                    **preprocessing_params
-                )
-            
+
+            # Fusionar el perfil del tipo de documento con los parámetros del
+            # caller (estos últimos mandan) y hacer UNA sola pasada de
+            # preprocesamiento: encadenar optimize_for_ocr + preprocess_advanced
+            # binarizaba dos veces y pisaba opciones del caller como
+            # denoise/binarize=False
+            profile = image_preprocessor.OPTIMIZATION_PROFILES.get(
+                document_type, image_preprocessor.OPTIMIZATION_PROFILES['general']
+            )
+            merged_params = {**profile, **preprocessing_params}
+
+            # El preprocesamiento es CPU puro (NumPy/OpenCV): ejecutarlo en
+            # el executor para no bloquear el event loop, igual que hace el
+            # orquestador con los proveedores síncronos
+            loop = asyncio.get_running_loop()
+
+            def _preprocess():
+                return image_preprocessor.preprocess_advanced(image, **merged_params)
+
+            processed_image = await loop.run_in_executor(None, _preprocess)
+
             preprocess_time = time.time() - preprocess_start
             pipeline_log.append(f"✅ Preprocesamiento completado en {preprocess_time:.2f}s")
-            
+
             # 4. Detección de límites del documento (opcional)
-            document_bounds = image_preprocessor.detect_document_bounds(processed_image)
+            document_bounds = await loop.run_in_executor(
+                None, image_preprocessor.detect_document_bounds, processed_image
+            )
             if document_bounds:
                 pipeline_log.append(f"📄 Documento detectado en: {document_bounds}")
             
@@ -182,18 +211,19 @@ class OCRProcessor:
             
             # 8. Guardar en cache si fue exitoso
             if final_result['success'] and use_cache:
-                self.cache[image_hash] = final_result.copy()
+                self.cache[cache_key] = final_result.copy()
                 pipeline_log.append("💾 Resultado guardado en cache")
-                
-                # Limpiar cache si es muy grande (simple LRU)
-                if len(self.cache) > 100:
-                    oldest_key = min(self.cache.keys())
-                    del self.cache[oldest_key]
+
+                # Expulsar la entrada menos usada recientemente (LRU real:
+                # el OrderedDict mantiene el orden de uso vía move_to_end)
+                if len(self.cache) > self.cache_max_size:
+                    self.cache.popitem(last=False)
             
             # 9. Actualizar estadísticas
             self._update_stats(final_result)
             
-            logger.info(f"Pipeline OCR completado: success={final_result['success']}, confidence={final_confidence:.1f}, provider={ocr_result.provider}, time={total_time:.2f}s")
+            logger.info("Pipeline OCR completado: success=%s, confidence=%.1f, provider=%s, time=%.2fs",
+                        final_result['success'], final_confidence, ocr_result.provider, total_time)
             
             return final_result
             
@@ -215,13 +245,13 @@ class OCRProcessor:
     
     def _calculate_image_hash(self, image: Image.Image) -> str:
         """Calcular hash único de la imagen para cache"""
-        # Convertir imagen a bytes para hash
-        import io
-        img_buffer = io.BytesIO()
-        image.save(img_buffer, format='PNG')
-        image_bytes = img_buffer.getvalue()
-        
-        return hashlib.sha256(image_bytes).hexdigest()
+        # Hashear los píxeles crudos (más tamaño y modo, que desambiguan
+        # buffers idénticos): evita codificar un PNG completo solo para
+        # obtener bytes estables
+        hasher = hashlib.sha256()
+        hasher.update(f'{image.mode}:{image.width}x{image.height}:'.encode())
+        hasher.update(image.tobytes())
+        return hasher.hexdigest()
     
     def _detect_optimal_preprocessing(self, image: Image.Image, document_type: str) -> Dict:
         """Detectar parámetros óptimos de preprocesamiento automáticamente"""
@@ -234,7 +264,6 @@ class OCRProcessor:
         gray_image = image.convert('L') if image.mode != 'L' else image
         
         # Calcular estadísticas de intensidad
-        import numpy as np
         img_array = np.array(gray_image)
         mean_intensity = np.mean(img_array)
         std_intensity = np.std(img_array)
@@ -265,7 +294,7 @@ class OCRProcessor:
             params['sharpness'] = 0  # No aplicar sharpening a escritura manual
             params['contrast'] = min(params['contrast'], 110)
         
-        logger.debug(f"Parámetros automáticos detectados: {params}")
+        logger.debug("Parámetros automáticos detectados: %s", params)
         return params
     
     def _update_stats(self, result: Dict):
@@ -10,82 +10,171 @@ import unicodedata
 
 logger = logging.getLogger(__name__)
 
+# Correcciones específicas por idioma, compiladas a nivel de módulo para no
+# recompilar los patrones en cada llamada
+LANGUAGE_CORRECTIONS = {
+    'es': [
+        (re.compile(pattern, re.IGNORECASE), replacement)
+        for pattern, replacement in (
+            (r'\bñ\b', 'ñ'),  # Corregir ñ aislada
+            (r'\bÑ\b', 'Ñ'),
+            (r'([aeiou])n([aeiou])', r'\1ñ\2'),  # Posibles ñ perdidas
+            (r'\bque\b', 'que'),  # Palabra muy común
+            (r'\bdel\b', 'del'),
+            (r'\bcon\b', 'con'),
+            (r'\bpor\b', 'por'),
+            (r'\bpara\b', 'para'),
+        )
+    ],
+    'en': [
+        (re.compile(pattern, re.IGNORECASE), replacement)
+        for pattern, replacement in (
+            (r'\bthe\b', 'the'),
+            (r'\band\b', 'and'),
+            (r'\bwith\b', 'with'),
+            (r'\bfrom\b', 'from'),
+            (r'\bthis\b', 'this'),
+            (r'\bthat\b', 'that'),
+        )
+    ],
+}
+
+# Correcciones específicas por tipo de documento (mismo formato)
+DOCUMENT_CORRECTIONS = {
+    'invoice': [
+        (re.compile(pattern, re.IGNORECASE), replacement)
+        for pattern, replacement in (
+            (r'\bfACTURA\b', 'FACTURA'),
+            (r'\bfactura\b', 'factura'),
+            (r'\bTOTAL\b', 'TOTAL'),
+            (r'\bIVA\b', 'IVA'),
+            (r'\bSUBTOTAL\b', 'SUBTOTAL'),
+            (r'(\d+)[.,](\d{2})\s*€', r'\1,\2 €'),  # Formato de moneda
+            (r'(\d+)[.,](\d{2})\s*\$', r'\1.\2 $'),
+        )
+    ],
+    'contact': [
+        (re.compile(r'\bTEL[EF]ONO\b', re.IGNORECASE), 'TELÉFONO'),
+        (re.compile(r'\bEMAIL\b', re.IGNORECASE), 'EMAIL'),
+        (re.compile(r'\bDIRECCION\b', re.IGNORECASE), 'DIRECCIÓN'),
+        (re.compile(r'(\d{3})\s*(\d{3})\s*(\d{3})'), r'\1 \2 \3'),  # Formato teléfono
+        # Email en minúsculas (reemplazo con callable, sin IGNORECASE)
+        (re.compile(r'([a-zA-Z0-9._%+-]+)@([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'),
+         lambda m: m.group(0).lower()),
+    ],
+}
+
+# Confusiones típicas del OCR entre dígitos y letras según el contexto
+LETTER_FOR_DIGIT = {'0': 'O', '1': 'I', '5': 'S', '8': 'B', '6': 'G'}
+DIGIT_FOR_LETTER = {'O': '0', 'I': '1', 'S': '5', 'B': '8'}
+
+# Patrones de métricas de calidad, compilados a nivel de módulo
+QUALITY_PATTERNS = {
+    'word': re.compile(r'\b\w+\b'),
+    'digit': re.compile(r'\d'),
+    'punctuation': re.compile(r'[,.;:!?]'),
+    'uppercase': re.compile(r'[A-Z]'),
+    'lowercase': re.compile(r'[a-z]'),
+    'special': re.compile(r'[^\w\s]'),
+    'space': re.compile(r'\s'),
+}
+
+# Elementos estructurados detectables en el texto (mismo criterio)
+STRUCTURED_ELEMENT_PATTERNS = {
+    'emails': re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),
+    'phones': re.compile(r'\b(?:\+34|0034)?\s*(?:6|7|8|9)\d{8}\b'),
+    'dates': re.compile(r'\b\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4}\b'),
+    'amounts': re.compile(r'\b\d+[.,]\d{2}\s*[€$]\b'),
+    'postal_codes': re.compile(r'\b\d{5}\b'),
+    'dni_nie': re.compile(r'\b\d{8}[A-Za-z]\b'),
+    'urls': re.compile(r'https?://[^\s]+'),
+    'iban': re.compile(r'\bES\d{22}\b'),
+}
+
+# Patrones comunes de clave-valor, compilados una sola vez
+KEY_VALUE_PATTERNS = (
+    re.compile(r'([A-Za-záéíóúüñÁÉÍÓÚÜÑ\s]+):\s*([^\n]+)'),  # Clave: Valor
+    re.compile(r'([A-Za-záéíóúüñÁÉÍÓÚÜÑ\s]+)\s*:\s*([^\n]+)'),  # Clave : Valor
+    re.compile(r'([A-Za-záéíóúüñÁÉÍÓÚÜÑ\s]+)\s+([A-Za-z0-9@.\-]+)'),  # Nombre Email/Teléfono
+)
+
+# Normalización de espacios alrededor de puntuación y paréntesis, fusionada
+# en una sola alternación: cada rama elimina el espacio pegado a un signo,
+# así que el reemplazo común es el token sin espacios (una pasada sobre el
+# texto en lugar de cinco)
+SPACING_RE = re.compile(r'\s+[,.;:!?)\]]|[(\[]\s+')
+
+def _strip_spacing(match: re.Match) -> str:
+    return match.group(0).strip()
+
 class TextPostprocessor:
     """Clase para post-procesamiento inteligente de texto OCR"""
     
     def __init__(self):
-        self.correction_patterns = self._load_correction_patterns()
+        (self.confusion_patterns,
+         self.char_translation) = self._load_correction_patterns()
         self.confidence_rules = self._load_confidence_rules()
-    
-    def _load_correction_patterns(self) -> Dict[str, str]:
-        """Cargar patrones de corrección comunes de OCR"""
-        return {
-            # Números confundidos con letras en contexto de letras
-            r'\b([A-Za-záéíóúüñ]+)0([A-Za-záéíóúüñ]+)\b': r'\1O\2',
-            r'\b([A-Za-záéíóúüñ]+)1([A-Za-záéíóúüñ]+)\b': r'\1I\2',
-            r'\b([A-Za-záéíóúüñ]+)5([A-Za-záéíóúüñ]+)\b': r'\1S\2',
-            r'\b([A-Za-záéíóúüñ]+)8([A-Za-záéíóúüñ]+)\b': r'\1B\2',
-            r'\b([A-Za-záéíóúüñ]+)6([A-Za-záéíóúüñ]+)\b': r'\1G\2',
-            
-            # Letras confundidas con números en contexto numérico
-            r'\b(\d+)O(\d+)\b': r'\g<1>0\g<2>',
-            r'\b(\d+)I(\d+)\b': r'\g<1>1\g<2>',
-            r'\b(\d+)S(\d+)\b': r'\g<1>5\g<2>',
-            r'\b(\d+)B(\d+)\b': r'\g<1>8\g<2>',
-            
-            # Caracteres especiales comunes
-            r'\|': 'I',
-            r'`': "'",
-            r'´': "'",
-            r''': "'",
-            r''': "'",
-            r'"': '"',
-            r'"': '"',
-            r'°': 'o',
-            r'¢': 'c',
-            r'£': 'E',
-            
-            # Espacios antes de puntuación
-            r'\s+([,.;:!?])': r'\1',
-            
-            # Espacios después de paréntesis de apertura y antes de cierre
-            r'\(\s+': '(',
-            r'\s+\)': ')',
-            r'\[\s+': '[',
-            r'\s+\]': ']',
-            
-            # Múltiples espacios
-            r'\s+': ' ',
-            
-            # Líneas vacías múltiples
-            r'\n\s*\n\s*\n': '\n\n',
-        }
+
+    def _load_correction_patterns(self) -> Tuple[List, Dict]:
+        """Cargar patrones de corrección comunes de OCR (compilados una sola vez)"""
+
+        # Números confundidos con letras en contexto de letras y viceversa:
+        # una alternación por dirección con callback, en lugar de un escaneo
+        # completo del texto por cada dígito/letra confundible
+        confusion_patterns = [
+            (re.compile(r'\b([A-Za-záéíóúüñ]+)([01586])([A-Za-záéíóúüñ]+)\b'),
+             lambda m: m.group(1) + LETTER_FOR_DIGIT[m.group(2)] + m.group(3)),
+            (re.compile(r'\b(\d+)([OISB])(\d+)\b'),
+             lambda m: m.group(1) + DIGIT_FOR_LETTER[m.group(2)] + m.group(3)),
+        ]
+
+        # Sustituciones de un solo carácter: una tabla de str.translate
+        # las resuelve todas en una única pasada C sobre el texto
+        # (las comillas tipográficas van como escapes \\u para que ningún
+        # editor las vuelva a convertir en comillas ASCII)
+        char_translation = str.maketrans({
+            '|': 'I',
+            '`': "'",
+            '´': "'",
+            '\u2018': "'",
+            '\u2019': "'",
+            '\u201c': '"',
+            '\u201d': '"',
+            '°': 'o',
+            '¢': 'c',
+            '£': 'E',
+        })
+
+        return confusion_patterns, char_translation
     
     def _load_confidence_rules(self) -> List[Dict]:
-        """Cargar reglas para evaluar confianza del texto"""
+        """Cargar reglas para evaluar confianza del texto (patrones compilados)"""
         return [
             {
-                'pattern': r'\d+',
+                'pattern': re.compile(r'\d+', re.IGNORECASE),
                 'weight': 0.1,
                 'description': 'Contiene números'
             },
             {
-                'pattern': r'[A-Z][a-z]+',
+                'pattern': re.compile(r'[A-Z][a-z]+', re.IGNORECASE),
                 'weight': 0.2,
                 'description': 'Palabras capitalizadas'
             },
             {
-                'pattern': r'\b[a-zA-Z]{3,}\b',
+                'pattern': re.compile(r'\b[a-zA-Z]{3,}\b', re.IGNORECASE),
                 'weight': 0.3,
                 'description': 'Palabras de 3+ letras'
             },
             {
-                'pattern': r'[,.;:!?]',
+                'pattern': re.compile(r'[,.;:!?]', re.IGNORECASE),
                 'weight': 0.1,
                 'description': 'Puntuación correcta'
             },
             {
-                'pattern': r'\b(el|la|de|en|y|a|un|una|con|por|para|como|su|del|al)\b',
+                'pattern': re.compile(
+                    r'\b(el|la|de|en|y|a|un|una|con|por|para|como|su|del|al)\b',
+                    re.IGNORECASE
+                ),
                 'weight': 0.2,
                 'description': 'Palabras comunes en español'
             }
@@ -129,8 +218,8 @@ class TextPostprocessor:
         # Limpieza final
         final_text = specialized_text.strip()
         
-        logger.info(f"Post-procesamiento: {original_length} -> {len(final_text)} caracteres, "
-                   f"{corrections_count} correcciones, confianza: {confidence_score:.2f}")
+        logger.debug("Post-procesamiento: %d -> %d caracteres, %d correcciones, confianza: %.2f",
+                     original_length, len(final_text), corrections_count, confidence_score)
         
         return {
             'text': final_text,
@@ -150,96 +239,42 @@ class TextPostprocessor:
         # Eliminar líneas vacías múltiples
         text = '\n'.join(line.strip() for line in text.split('\n') if line.strip())
         
-        # Aplicar patrones de corrección básicos
-        for pattern, replacement in self.correction_patterns.items():
-            text = re.sub(pattern, replacement, text)
-        
-        return text
+        # Confusiones letra/dígito, caracteres sueltos y espaciado,
+        # con los patrones ya compilados en el constructor
+        for pattern, replacement in self.confusion_patterns:
+            text = pattern.sub(replacement, text)
+
+        text = text.translate(self.char_translation)
+
+        text = SPACING_RE.sub(_strip_spacing, text)
+
+        # Colapsar espacios en blanco sin regex: str.split/join hace la
+        # misma normalización que re.sub(r'\s+', ' ', ...) en una única
+        # pasada C (y deja obsoleto el patrón de líneas vacías múltiples)
+        return ' '.join(text.split())
     
     def _apply_language_corrections(self, text: str, language: str) -> Tuple[str, int]:
         """Aplicar correcciones específicas del idioma"""
         corrections = 0
-        
-        if language == 'es':
-            # Correcciones específicas para español
-            spanish_corrections = {
-                r'\bñ\b': 'ñ',  # Corregir ñ aislada
-                r'\bÑ\b': 'Ñ',
-                r'([aeiou])n([aeiou])': r'\1ñ\2',  # Posibles ñ perdidas
-                r'\bque\b': 'que',  # Palabra muy común
-                r'\bdel\b': 'del',
-                r'\bcon\b': 'con',
-                r'\bpor\b': 'por',
-                r'\bpara\b': 'para',
-            }
-            
-            for pattern, replacement in spanish_corrections.items():
-                old_text = text
-                text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-                if text != old_text:
-                    corrections += 1
-        
-        elif language == 'en':
-            # Correcciones específicas para inglés
-            english_corrections = {
-                r'\bthe\b': 'the',
-                r'\band\b': 'and',
-                r'\bwith\b': 'with',
-                r'\bfrom\b': 'from',
-                r'\bthis\b': 'this',
-                r'\bthat\b': 'that',
-            }
-            
-            for pattern, replacement in english_corrections.items():
-                old_text = text
-                text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-                if text != old_text:
-                    corrections += 1
-        
+
+        for pattern, replacement in LANGUAGE_CORRECTIONS.get(language, ()):
+            old_text = text
+            text = pattern.sub(replacement, text)
+            if text != old_text:
+                corrections += 1
+
         return text, corrections
     
     def _apply_document_corrections(self, text: str, document_type: str) -> Tuple[str, int]:
         """Aplicar correcciones específicas por tipo de documento"""
         corrections = 0
-        
-        if document_type == 'invoice':
-            # Correcciones para facturas
-            invoice_patterns = {
-                r'\bfACTURA\b': 'FACTURA',
-                r'\bfactura\b': 'factura',
-                r'\bTOTAL\b': 'TOTAL',
-                r'\bIVA\b': 'IVA',
-                r'\bSUBTOTAL\b': 'SUBTOTAL',
-                r'(\d+)[.,](\d{2})\s*€': r'\1,\2 €',  # Formato de moneda
-                r'(\d+)[.,](\d{2})\s*\$': r'\1.\2 $',
-            }
-            
-            for pattern, replacement in invoice_patterns.items():
-                old_text = text
-                text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-                if text != old_text:
-                    corrections += 1
-        
-        elif document_type == 'contact':
-            # Correcciones para información de contacto
-            contact_patterns = {
-                r'\bTEL[EF]ONO\b': 'TELÉFONO',
-                r'\bEMAIL\b': 'EMAIL',
-                r'\bDIRECCION\b': 'DIRECCIÓN',
-                r'(\d{3})\s*(\d{3})\s*(\d{3})': r'\1 \2 \3',  # Formato teléfono
-                r'([a-zA-Z0-9._%+-]+)@([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})': 
-                    lambda m: m.group(0).lower(),  # Email en minúsculas
-            }
-            
-            for pattern, replacement in contact_patterns.items():
-                old_text = text
-                if callable(replacement):
-                    text = re.sub(pattern, replacement, text)
-                else:
-                    text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-                if text != old_text:
-                    corrections += 1
-        
+
+        for pattern, replacement in DOCUMENT_CORRECTIONS.get(document_type, ()):
+            old_text = text
+            text = pattern.sub(replacement, text)
+            if text != old_text:
+                corrections += 1
+
         return text, corrections
     
     def _analyze_quality(self, text: str) -> Dict:
@@ -248,42 +283,36 @@ class TextPostprocessor:
         if not text:
             return {'words': 0, 'chars': 0, 'lines': 0, 'avg_word_length': 0}
         
-        words = re.findall(r'\b\w+\b', text)
+        words = QUALITY_PATTERNS['word'].findall(text)
         lines = text.split('\n')
-        
+
         metrics = {
             'words': len(words),
             'chars': len(text),
             'lines': len(lines),
             'avg_word_length': sum(len(word) for word in words) / max(len(words), 1),
-            'has_numbers': bool(re.search(r'\d', text)),
-            'has_punctuation': bool(re.search(r'[,.;:!?]', text)),
-            'has_uppercase': bool(re.search(r'[A-Z]', text)),
-            'has_lowercase': bool(re.search(r'[a-z]', text)),
-            'special_chars_ratio': len(re.findall(r'[^\w\s]', text)) / max(len(text), 1),
-            'digit_ratio': len(re.findall(r'\d', text)) / max(len(text), 1),
-            'space_ratio': len(re.findall(r'\s', text)) / max(len(text), 1)
+            'has_numbers': bool(QUALITY_PATTERNS['digit'].search(text)),
+            'has_punctuation': bool(QUALITY_PATTERNS['punctuation'].search(text)),
+            'has_uppercase': bool(QUALITY_PATTERNS['uppercase'].search(text)),
+            'has_lowercase': bool(QUALITY_PATTERNS['lowercase'].search(text)),
+            'special_chars_ratio': len(QUALITY_PATTERNS['special'].findall(text)) / max(len(text), 1),
+            'digit_ratio': len(QUALITY_PATTERNS['digit'].findall(text)) / max(len(text), 1),
+            'space_ratio': len(QUALITY_PATTERNS['space'].findall(text)) / max(len(text), 1)
         }
-        
+
         return metrics
     
     def _detect_structured_elements(self, text: str) -> Dict:
         """Detectar elementos estructurados en el texto"""
         
         elements = {
-            'emails': re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text),
-            'phones': re.findall(r'\b(?:\+34|0034)?\s*(?:6|7|8|9)\d{8}\b', text),
-            'dates': re.findall(r'\b\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4}\b', text),
-            'amounts': re.findall(r'\b\d+[.,]\d{2}\s*[€$]\b', text),
-            'postal_codes': re.findall(r'\b\d{5}\b', text),
-            'dni_nie': re.findall(r'\b\d{8}[A-Za-z]\b', text),
-            'urls': re.findall(r'https?://[^\s]+', text),
-            'iban': re.findall(r'\bES\d{22}\b', text),
+            name: pattern.findall(text)
+            for name, pattern in STRUCTURED_ELEMENT_PATTERNS.items()
         }
-        
+
         # Filtrar elementos vacíos
         elements = {k: v for k, v in elements.items() if v}
-        
+
         return elements
     
     def _calculate_confidence(self, text: str, quality_metrics: Dict) -> float:
@@ -296,7 +325,7 @@ class TextPostprocessor:
         
         # Aplicar reglas de confianza
         for rule in self.confidence_rules:
-            matches = len(re.findall(rule['pattern'], text, re.IGNORECASE))
+            matches = len(rule['pattern'].findall(text))
             if matches > 0:
                 confidence += rule['weight'] * min(matches / 10, 1.0)
         
@@ -324,16 +353,9 @@ class TextPostprocessor:
         """Extraer pares clave-valor del texto"""
         
         pairs = {}
-        
-        # Patrones comunes de clave-valor
-        patterns = [
-            r'([A-Za-záéíóúüñÁÉÍÓÚÜÑ\s]+):\s*([^\n]+)',  # Clave: Valor
-            r'([A-Za-záéíóúüñÁÉÍÓÚÜÑ\s]+)\s*:\s*([^\n]+)',  # Clave : Valor
-            r'([A-Za-záéíóúüñÁÉÍÓÚÜÑ\s]+)\s+([A-Za-z0-9@.\-]+)',  # Nombre Email/Teléfono
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
+
+        for pattern in KEY_VALUE_PATTERNS:
+            matches = pattern.findall(text)
             for key, value in matches:
                 key = key.strip().lower()
                 value = value.strip()
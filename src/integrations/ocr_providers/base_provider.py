@@ -6,6 +6,8 @@ Interfaz base para proveedores de OCR
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, List
 from PIL import Image
+import asyncio
+import functools
 import logging
 
 logger = logging.getLogger(__name__)
@@ -154,7 +156,9 @@ class OCROrchestrator:
     def __init__(self):
         self.providers: List[OCRProvider] = []
         self.default_language = 'es'
-        self.min_confidence_threshold = 0.7
+        # Umbral en porcentaje (los proveedores devuelven confianza 0-100):
+        # al alcanzarlo se devuelve el resultado sin intentar más proveedores
+        self.min_confidence_threshold = 70
     
     def register_provider(self, provider: OCRProvider):
         """Registrar un proveedor de OCR"""
@@ -195,42 +199,55 @@ class OCROrchestrator:
             )
         
         last_error = "No se pudo procesar la imagen"
-        
+        best_result = None
+
         for i, provider in enumerate(self.providers[:max_attempts]):
             try:
-                logger.info(f"Intentando con proveedor {provider.name} (intento {i+1})")
+                logger.debug("Intentando con proveedor %s (intento %d)", provider.name, i + 1)
                 
                 # Validar imagen para este proveedor
                 validation = provider.validate_image(image)
                 if not validation['valid']:
-                    logger.warning(f"Imagen no válida para {provider.name}: {validation['errors']}")
+                    logger.warning("Imagen no válida para %s: %s", provider.name, validation['errors'])
                     continue
                 
                 # Preprocesar para este proveedor específico
                 processed_image = provider.preprocess_for_provider(image)
                 
-                # Procesar con OCR
-                result_dict = provider.process_image(processed_image, language, **kwargs)
+                # Procesar con OCR (los proveedores son síncronos: ejecutarlos
+                # en un executor para no bloquear el event loop mientras
+                # esperan la red o el subproceso de Tesseract)
+                loop = asyncio.get_running_loop()
+                result_dict = await loop.run_in_executor(
+                    None,
+                    functools.partial(provider.process_image, processed_image, language, **kwargs)
+                )
                 result = OCRResult(
                     **result_dict,
                     provider=provider.name,
                     language=language
                 )
                 
-                # Verificar si el resultado es bueno
-                if result.success and result.confidence >= self.min_confidence_threshold:
-                    logger.info(f"OCR exitoso con {provider.name}: "
-                               f"{result.confidence:.1f}% confianza")
+                # Corto-circuito: con confianza suficiente y texto real no
+                # tiene sentido pagar otro proveedor (más red/CPU) para
+                # confirmar lo que ya sabemos
+                if (result.success
+                        and result.confidence >= self.min_confidence_threshold
+                        and result.text.strip()):
+                    logger.info("OCR exitoso con %s: %.1f%% confianza",
+                                provider.name, result.confidence)
                     return result
-                
+
                 elif result.success:
-                    logger.info(f"OCR con {provider.name} tiene baja confianza: "
-                               f"{result.confidence:.1f}%")
-                    # Continuar con siguiente proveedor pero guardar este resultado
-                    last_result = result
-                
+                    logger.info("OCR con %s tiene baja confianza: %.1f%%",
+                                provider.name, result.confidence)
+                    # Continuar con siguiente proveedor pero conservar el
+                    # mejor resultado visto hasta ahora
+                    if best_result is None or result.confidence > best_result.confidence:
+                        best_result = result
+
                 else:
-                    logger.warning(f"OCR falló con {provider.name}: {result.error_message}")
+                    logger.warning("OCR falló con %s: %s", provider.name, result.error_message)
                     last_error = result.error_message
                 
             except Exception as e:
@@ -240,10 +257,10 @@ class OCROrchestrator:
         
         # Si llegamos aquí, ningún proveedor tuvo éxito con alta confianza
         # Devolver el mejor resultado que tengamos, si existe
-        if 'last_result' in locals():
-            logger.warning(f"Devolviendo resultado de baja confianza: "
-                          f"{last_result.confidence:.1f}%")
-            return last_result
+        if best_result is not None:
+            logger.warning("Devolviendo resultado de baja confianza: %.1f%%",
+                           best_result.confidence)
+            return best_result
         
         # No hay resultados válidos
         return OCRResult(
@@ -5,6 +5,8 @@ Proveedor OCR.Space - Implementación mejorada
 
 import time
 import io
+import re
+import threading
 import requests
 from PIL import Image, ImageOps, ImageFilter
 import base64
@@ -16,6 +18,57 @@ from .base_provider import OCRProvider, OCRResult
 
 logger = logging.getLogger(__name__)
 
+# Sesión compartida con keep-alive: reutiliza la conexión TCP+TLS con
+# api.ocr.space entre peticiones y reintentos (el handshake HTTPS cuesta
+# cientos de ms). Sin reintentos en el adapter: el backoff exponencial
+# vive en _call_ocr_space_api
+_SESSION = requests.Session()
+_SESSION.mount('https://', requests.adapters.HTTPAdapter(
+    pool_connections=4, pool_maxsize=10, max_retries=0
+))
+
+# Payload de prueba para los health checks, codificado una sola vez de
+# forma perezosa: un PNG blanco de 100x50 ocupa ~100 bytes frente a
+# re-codificar un JPEG en cada sondeo
+_TEST_IMAGE_BYTES = None
+
+# Patrones de extracción numérica compilados una sola vez (la ruta de
+# dígitos los aplica todos en cada llamada)
+_NUMBER_PATTERNS = (
+    re.compile(r'-?\d+[.,]\d+'),      # Decimales: 123.45 o 123,45
+    re.compile(r'-?\d+'),             # Enteros: 123
+    re.compile(r'\d+\s+\d+[.,]\d+'),  # Con espacios: 1 234.56
+    re.compile(r'\d+\s+\d+'),         # Con espacios: 1 234
+)
+_LOOSE_DIGITS_RE = re.compile(r'[\d.,\-\s]+')
+_WHITESPACE_RE = re.compile(r'\s+')
+_VALID_NUMBER_RE = re.compile(r'^-?\d+\.?\d*$')
+_DIGIT_RUN_RE = re.compile(r'\d+')
+# Caracteres fuera de ASCII que no son acentos españoles válidos
+_WEIRD_CHARS_RE = re.compile(r'[^\x00-\x7FáéíóúüñÁÉÍÓÚÜÑ]')
+
+# Buffer de codificación reutilizado por hilo: evita asignar y liberar un
+# BytesIO del tamaño de la imagen en cada petición (getvalue() devuelve
+# una copia, así que reutilizar el buffer es seguro)
+_tls = threading.local()
+
+def _get_encode_buffer() -> io.BytesIO:
+    buf = getattr(_tls, 'encode_buffer', None)
+    if buf is None:
+        buf = io.BytesIO()
+        _tls.encode_buffer = buf
+    buf.seek(0)
+    buf.truncate()
+    return buf
+
+def _get_test_image_bytes() -> bytes:
+    global _TEST_IMAGE_BYTES
+    if _TEST_IMAGE_BYTES is None:
+        buf = io.BytesIO()
+        Image.new('L', (100, 50), color=255).save(buf, format='PNG', optimize=True)
+        _TEST_IMAGE_BYTES = buf.getvalue()
+    return _TEST_IMAGE_BYTES
+
 class OCRSpaceProvider(OCRProvider):
     """Proveedor OCR usando OCR.Space API"""
     
@@ -33,7 +86,11 @@ class OCRSpaceProvider(OCRProvider):
         
         if config:
             default_config.update(config)
-        
+
+        # Resultado del último sondeo de conexión con su marca de tiempo
+        # (inicializado antes de super().__init__, que ya sondea)
+        self._conn_check_cache = {'t': 0.0, 'result': None}
+
         super().__init__("OCR.Space", default_config)
     
     def _initialize(self) -> bool:
@@ -100,7 +157,7 @@ class OCRSpaceProvider(OCRProvider):
             
         # Mapear código estándar a OCR.Space
         mapped_language = language_mapping.get(language.lower(), 'spa')
-        logger.debug(f"Mapeando idioma '{language}' a '{mapped_language}'")
+        logger.debug("Mapeando idioma '%s' a '%s'", language, mapped_language)
         return mapped_language
     
     def process_image(
@@ -118,7 +175,7 @@ class OCRSpaceProvider(OCRProvider):
         
         # Mapear código de idioma al formato OCR.Space
         mapped_language = self._map_language_code(language)
-        logger.debug(f"Procesando imagen con idioma '{language}' -> '{mapped_language}'")
+        logger.debug("Procesando imagen con idioma '%s' -> '%s'", language, mapped_language)
         
         try:
             # Validar imagen
@@ -138,26 +195,35 @@ class OCRSpaceProvider(OCRProvider):
             else:
                 processed_image = self._prepare_image_for_ocr_space(image)
             
-            # Convertir a bytes
-            img_buffer = io.BytesIO()
-            processed_image.save(img_buffer, format='JPEG', quality=90, optimize=True)
+            # Convertir a bytes. La imagen de dígitos va binarizada: un PNG
+            # monocanal sin pérdida pesa una fracción del JPEG y evita el
+            # ringing de compresión alrededor de los trazos
+            img_buffer = _get_encode_buffer()
+            if digits_only:
+                processed_image.convert('L').save(img_buffer, format='PNG', optimize=True)
+                file_name = 'image.png'
+            else:
+                processed_image.save(img_buffer, format='JPEG', quality=90, optimize=True)
+                file_name = 'image.jpg'
             image_bytes = img_buffer.getvalue()
-            
+
             # Verificar tamaño
             if len(image_bytes) > self.config['max_file_size_mb'] * 1024 * 1024:
                 # Comprimir más agresivamente
-                img_buffer = io.BytesIO()
+                img_buffer = _get_encode_buffer()
                 processed_image.save(img_buffer, format='JPEG', quality=70, optimize=True)
                 image_bytes = img_buffer.getvalue()
-            
+                file_name = 'image.jpg'
+
             # Llamar a la API
             result = self._call_ocr_space_api(
-                image_bytes, 
-                mapped_language, 
-                engine, 
-                self.config['max_retries'], 
+                image_bytes,
+                mapped_language,
+                engine,
+                self.config['max_retries'],
                 self.config['timeout'],
-                digits_only
+                digits_only,
+                file_name
             )
             
             result['processing_time'] = time.time() - start_time
@@ -223,7 +289,7 @@ class OCRSpaceProvider(OCRProvider):
             scale = target_height / float(h)
             new_size = (int(w * scale), int(h * scale))
             image = image.resize(new_size, Image.Resampling.LANCZOS)
-            logger.debug(f"Imagen escalada para dígitos: {w}x{h} -> {new_size[0]}x{new_size[1]}")
+            logger.debug("Imagen escalada para dígitos: %dx%d -> %dx%d", w, h, new_size[0], new_size[1])
         
         # Convertir a escala de grises para mejor contraste de dígitos
         grayscale = ImageOps.grayscale(image)
@@ -255,48 +321,36 @@ class OCRSpaceProvider(OCRProvider):
     
     def _extract_digits_only(self, text: str) -> str:
         """Extraer solo dígitos y puntos decimales del texto OCR"""
-        import re
-        
+
         if not text:
             return ""
-        
+
         # Remover saltos de línea y espacios extras
         cleaned_text = text.replace('\n', ' ').replace('\r', ' ')
-        
+
         # Extraer números (incluyendo decimales y negativos)
-        # Patrón: números enteros, decimales, con posibles espacios entre dígitos
-        number_patterns = [
-            r'-?\d+[.,]\d+',          # Decimales: 123.45 o 123,45
-            r'-?\d+',                 # Enteros: 123
-            r'\d+\s+\d+[.,]\d+',      # Con espacios: 1 234.56
-            r'\d+\s+\d+',             # Con espacios: 1 234
-        ]
-        
         numbers = []
-        for pattern in number_patterns:
-            matches = re.findall(pattern, cleaned_text)
-            numbers.extend(matches)
-        
+        for pattern in _NUMBER_PATTERNS:
+            numbers.extend(pattern.findall(cleaned_text))
+
         # Si no encontramos números con patrones, extraer dígitos sueltos
         if not numbers:
             # Extraer solo dígitos, puntos y comas
-            digits_only = re.findall(r'[\d.,\-\s]+', cleaned_text)
+            digits_only = _LOOSE_DIGITS_RE.findall(cleaned_text)
             if digits_only:
                 # Limpiar espacios extra y unir
                 cleaned_digits = ''.join(digits_only).strip()
                 # Remover espacios internos pero mantener puntos/comas
-                cleaned_digits = re.sub(r'\s+', '', cleaned_digits)
+                cleaned_digits = _WHITESPACE_RE.sub('', cleaned_digits)
                 numbers = [cleaned_digits] if cleaned_digits else []
-        
+
         # Procesar y limpiar números encontrados
         processed_numbers = []
         for num in numbers:
-            # Limpiar espacios
-            num = re.sub(r'\s+', '', num)
-            # Reemplazar comas por puntos para estándar decimal
-            num = num.replace(',', '.')
+            # Limpiar espacios y normalizar comas a puntos decimales
+            num = _WHITESPACE_RE.sub('', num).replace(',', '.')
             # Validar que es un número válido
-            if re.match(r'^-?\d+\.?\d*$', num):
+            if _VALID_NUMBER_RE.match(num):
                 processed_numbers.append(num)
         
         # Devolver el número más probable (el más largo o primero encontrado)
@@ -304,14 +358,14 @@ class OCRSpaceProvider(OCRProvider):
             # Ordenar por longitud (número más completo)
             processed_numbers.sort(key=len, reverse=True)
             result = processed_numbers[0]
-            logger.debug(f"Números extraídos: {processed_numbers} -> seleccionado: '{result}'")
+            logger.debug("Números extraídos: %s -> seleccionado: '%s'", processed_numbers, result)
             return result
         
         # Como último recurso, extraer solo dígitos consecutivos
-        digits_only = re.findall(r'\d+', text)
+        digits_only = _DIGIT_RUN_RE.findall(text)
         if digits_only:
             result = ''.join(digits_only)
-            logger.debug(f"Extrayendo solo dígitos consecutivos: '{result}'")
+            logger.debug("Extrayendo solo dígitos consecutivos: '%s'", result)
             return result
         
         logger.warning(f"No se pudieron extraer dígitos del texto: '{text}'")
@@ -322,9 +376,10 @@ class OCRSpaceProvider(OCRProvider):
         image_bytes: bytes, 
         language: str, 
         engine: int, 
-        retries: int, 
+        retries: int,
         timeout: int,
-        digits_only: bool = False
+        digits_only: bool = False,
+        file_name: str = 'image.jpg'
     ) -> Dict[str, Any]:
         """Llamar a la API de OCR.Space con reintentos"""
         
@@ -349,12 +404,12 @@ class OCRSpaceProvider(OCRProvider):
         
         for attempt in range(1, retries + 1):
             try:
-                logger.debug(f"OCR.Space API llamada, intento {attempt}")
+                logger.debug("OCR.Space API llamada, intento %d", attempt)
                 
-                response = requests.post(
+                response = _SESSION.post(
                     self.endpoint,
                     data=data,
-                    files={"filename": ("image.jpg", image_bytes, "application/octet-stream")},
+                    files={"filename": (file_name, image_bytes, "application/octet-stream")},
                     timeout=timeout,
                 )
                 response.raise_for_status()
@@ -373,7 +428,9 @@ class OCRSpaceProvider(OCRProvider):
                     # Si es error 500, intentar con motor alternativo
                     if "internal server error" in error_msg.lower() and engine == 2:
                         logger.warning(f"Error 500 con motor {engine}, probando motor 3...")
-                        return self._call_ocr_space_api(image_bytes, language, 3, 1, timeout)
+                        return self._call_ocr_space_api(
+                            image_bytes, language, 3, 1, timeout, digits_only, file_name
+                        )
                     
                     raise RuntimeError(f"OCR.Space error: {error_msg}")
                 
@@ -394,7 +451,7 @@ class OCRSpaceProvider(OCRProvider):
                 if digits_only:
                     original_text = text
                     text = self._extract_digits_only(text)
-                    logger.debug(f"Filtrado de dígitos: '{original_text}' -> '{text}'")
+                    logger.debug("Filtrado de dígitos: '%s' -> '%s'", original_text, text)
                 
                 # Calcular confianza promedio si está disponible
                 confidence = self._calculate_confidence(parsed_result)
@@ -492,27 +549,38 @@ class OCRSpaceProvider(OCRProvider):
         word_count = sum(1 for word in common_words if word in text.lower())
         confidence += min(word_count * 5, 20)
         
-        # Penalizar muchos caracteres extraños
-        weird_chars = sum(1 for c in text if ord(c) > 127 and c not in 'áéíóúüñÁÉÍÓÚÜÑ')
+        # Penalizar muchos caracteres extraños (conteo en C vía regex
+        # compilada, no bucle Python por carácter)
+        weird_chars = len(_WEIRD_CHARS_RE.findall(text))
         if weird_chars > len(text) * 0.1:
             confidence -= 20
         
         return max(0.0, min(100.0, confidence))
     
-    def test_connection(self) -> Dict[str, Any]:
-        """Probar conexión con OCR.Space"""
+    def test_connection(self, max_age: float = 60.0) -> Dict[str, Any]:
+        """Probar conexión con OCR.Space (resultado cacheado con TTL)
+
+        Los sondeos de /api/health y las comprobaciones previas a reintentos
+        pueden llegar en ráfagas; pagar un POST real a OCR.Space por cada uno
+        no aporta información nueva dentro de la ventana.
+        """
+        cache = self._conn_check_cache
+        if cache['result'] is not None and time.time() - cache['t'] < max_age:
+            return cache['result']
+
+        result = self._test_connection_uncached()
+        cache['t'] = time.time()
+        cache['result'] = result
+        return result
+
+    def _test_connection_uncached(self) -> Dict[str, Any]:
+        """Sondeo real contra la API, sin cache"""
         try:
-            # Crear imagen de prueba muy simple
-            test_img = Image.new('RGB', (100, 50), color='white')
-            
-            # Convertir a bytes
-            img_buffer = io.BytesIO()
-            test_img.save(img_buffer, format='JPEG', quality=90)
-            image_bytes = img_buffer.getvalue()
-            
-            # Llamada de prueba con timeout corto
-            result = self._call_ocr_space_api(image_bytes, "spa", 2, 1, 10)
-            
+            # Llamada de prueba con timeout corto y payload precalculado
+            result = self._call_ocr_space_api(
+                _get_test_image_bytes(), "spa", 2, 1, 10, file_name='image.png'
+            )
+
             return {
                 'success': True,
                 'message': 'OCR.Space conectado correctamente',
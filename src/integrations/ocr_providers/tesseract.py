@@ -4,10 +4,9 @@ Proveedor Tesseract - Fallback local
 """
 
 import time
-import io
-import subprocess
-import tempfile
 import os
+import re
+import subprocess
 from PIL import Image
 from typing import Dict, List, Any
 import logging
@@ -16,24 +15,51 @@ from .base_provider import OCRProvider
 
 logger = logging.getLogger(__name__)
 
+# Caracteres fuera de ASCII que no son puntuación/acentos españoles válidos
+_WEIRD_CHARS_RE = re.compile(r'[^\x00-\x7FáéíóúüñÁÉÍÓÚÜÑ¿¡]')
+
+# Mapeo de códigos de idioma estándar a códigos Tesseract (constante de módulo
+# para no reconstruir el dict en cada llamada a process_image)
+LANG_MAP = {
+    'es': 'spa', 'spa': 'spa',
+    'en': 'eng', 'eng': 'eng',
+    'fr': 'fra', 'fra': 'fra',
+    'de': 'deu', 'deu': 'deu',
+    'it': 'ita', 'ita': 'ita',
+    'pt': 'por', 'por': 'por'
+}
+
 class TesseractProvider(OCRProvider):
     """Proveedor OCR usando Tesseract local como fallback"""
     
     def __init__(self, tesseract_path: str = None, config: Dict = None):
         self.tesseract_path = tesseract_path or self._find_tesseract()
+        self._supported_languages = None  # Cache de `tesseract --list-langs`
         
         default_config = {
             'psm': 6,  # Page segmentation mode
             'oem': 3,  # OCR Engine mode
-            'timeout': 30,
-            'temp_cleanup': True
+            'timeout': 30
         }
         
         if config:
             default_config.update(config)
         
         super().__init__("Tesseract", default_config)
-    
+
+        # Argumentos fijos del comando, calculados una sola vez por instancia
+        self._base_args = [
+            '--psm', str(self.config['psm']),
+            '--oem', str(self.config['oem']),
+            'tsv'
+        ]
+
+        # Limitar Tesseract a un hilo por proceso: las peticiones ya se
+        # paralelizan a nivel de request (OCR_EXECUTOR en el backend), y
+        # varios procesos multihilo compitiendo por los mismos cores
+        # degradan el rendimiento en lugar de mejorarlo
+        self._subprocess_env = {**os.environ, 'OMP_THREAD_LIMIT': '1'}
+
     def _find_tesseract(self) -> str:
         """Buscar instalación de Tesseract en el sistema"""
         possible_paths = [
@@ -84,27 +110,36 @@ class TesseractProvider(OCRProvider):
             return False
     
     def get_supported_languages(self) -> List[str]:
-        """Obtener idiomas soportados por Tesseract"""
+        """Obtener idiomas soportados por Tesseract (cacheado tras la primera consulta)"""
+        if self._supported_languages is not None:
+            return self._supported_languages
+
         if not self.tesseract_path:
-            return []
-        
+            self._supported_languages = []
+            return self._supported_languages
+
+        # La lista de idiomas instalados no cambia en vida del proceso:
+        # consultar el subprocess una sola vez y memorizar el resultado
+        # (este método se invoca desde get_provider_info en cada /api/health)
         try:
             result = subprocess.run(
                 [self.tesseract_path, '--list-langs'],
                 capture_output=True, text=True, timeout=10
             )
-            
+
             if result.returncode == 0:
                 # Primera línea es cabecera, el resto son idiomas
                 lines = result.stdout.strip().split('\n')[1:]
-                return [lang.strip() for lang in lines if lang.strip()]
+                self._supported_languages = [lang.strip() for lang in lines if lang.strip()]
             else:
                 # Idiomas comunes por defecto
-                return ['eng', 'spa', 'fra', 'deu', 'ita', 'por']
-                
+                self._supported_languages = ['eng', 'spa', 'fra', 'deu', 'ita', 'por']
+
         except Exception as e:
             logger.warning(f"No se pudieron obtener idiomas de Tesseract: {e}")
-            return ['eng', 'spa']
+            self._supported_languages = ['eng', 'spa']
+
+        return self._supported_languages
     
     def process_image(
         self, 
@@ -113,23 +148,13 @@ class TesseractProvider(OCRProvider):
         **kwargs
     ) -> Dict[str, Any]:
         """Procesar imagen con Tesseract"""
-        
+
         start_time = time.time()
-        temp_files = []
-        
+
         try:
             # Mapear códigos de idioma
-            lang_map = {
-                'es': 'spa', 'spa': 'spa',
-                'en': 'eng', 'eng': 'eng',
-                'fr': 'fra', 'fra': 'fra',
-                'de': 'deu', 'deu': 'deu',
-                'it': 'ita', 'ita': 'ita',
-                'pt': 'por', 'por': 'por'
-            }
-            
-            tesseract_lang = lang_map.get(language, 'eng')
-            
+            tesseract_lang = LANG_MAP.get(language, 'eng')
+
             # Validar imagen
             validation = self.validate_image(image)
             if not validation['valid']:
@@ -140,78 +165,65 @@ class TesseractProvider(OCRProvider):
                     'processing_time': 0,
                     'error_message': f"Imagen no válida: {validation['errors']}"
                 }
-            
+
             # Preparar imagen para Tesseract
             processed_image = self._prepare_image_for_tesseract(image)
-            
-            # Crear archivo temporal para la imagen
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_img:
-                processed_image.save(temp_img.name, 'PNG')
-                temp_files.append(temp_img.name)
-                
-                # Crear archivo temporal para la salida
-                with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as temp_out:
-                    temp_files.append(temp_out.name)
-                    output_base = temp_out.name[:-4]  # Sin extensión
-                
-                # Construir comando Tesseract
-                cmd = [
-                    self.tesseract_path,
-                    temp_img.name,
-                    output_base,
-                    '-l', tesseract_lang,
-                    '--psm', str(self.config['psm']),
-                    '--oem', str(self.config['oem'])
-                ]
-                
-                # Ejecutar Tesseract
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=self.config['timeout']
+
+            # Pasar la imagen por stdin como PGM crudo (cabecera ASCII +
+            # píxeles tal cual): _prepare_image_for_tesseract garantiza
+            # modo 'L', así que no hace falta pagar la codificación y
+            # decodificación de un PNG por petición
+            pgm_data = (b'P5 %d %d 255\n' % processed_image.size
+                        + processed_image.tobytes())
+
+            cmd = [
+                self.tesseract_path,
+                '-',  # stdin
+                '-',  # stdout
+                '-l', tesseract_lang,
+                *self._base_args
+            ]
+
+            # Ejecutar Tesseract
+            result = subprocess.run(
+                cmd,
+                input=pgm_data,
+                capture_output=True,
+                timeout=self.config['timeout'],
+                env=self._subprocess_env
+            )
+
+            if result.returncode == 0:
+                # Extraer texto y confianza desde la salida TSV
+                text, confidence = self._parse_tsv_output(
+                    result.stdout.decode('utf-8', errors='replace')
                 )
-                
-                if result.returncode == 0:
-                    # Leer texto extraído
-                    output_file = output_base + '.txt'
-                    if os.path.exists(output_file):
-                        with open(output_file, 'r', encoding='utf-8') as f:
-                            text = f.read().strip()
-                        temp_files.append(output_file)
-                        
-                        # Calcular confianza estimada
-                        confidence = self._estimate_confidence(text, processed_image)
-                        
-                        return {
-                            'success': True,
-                            'text': text,
-                            'confidence': confidence,
-                            'processing_time': time.time() - start_time,
-                            'metadata': {
-                                'tesseract_version': self._get_version(),
-                                'language_used': tesseract_lang,
-                                'psm': self.config['psm'],
-                                'oem': self.config['oem']
-                            }
-                        }
-                    else:
-                        return {
-                            'success': False,
-                            'text': '',
-                            'confidence': 0,
-                            'processing_time': time.time() - start_time,
-                            'error_message': 'Tesseract no generó archivo de salida'
-                        }
-                else:
-                    return {
-                        'success': False,
-                        'text': '',
-                        'confidence': 0,
-                        'processing_time': time.time() - start_time,
-                        'error_message': f'Tesseract error: {result.stderr}'
+
+                # Si Tesseract no reportó confianza, estimarla
+                if confidence is None:
+                    confidence = self._estimate_confidence(text, processed_image)
+
+                return {
+                    'success': True,
+                    'text': text,
+                    'confidence': confidence,
+                    'processing_time': time.time() - start_time,
+                    'metadata': {
+                        'tesseract_version': self._get_version(),
+                        'language_used': tesseract_lang,
+                        'psm': self.config['psm'],
+                        'oem': self.config['oem']
                     }
-        
+                }
+            else:
+                return {
+                    'success': False,
+                    'text': '',
+                    'confidence': 0,
+                    'processing_time': time.time() - start_time,
+                    'error_message': f"Tesseract error: {result.stderr.decode('utf-8', errors='replace')}"
+                }
+
         except subprocess.TimeoutExpired:
             return {
                 'success': False,
@@ -220,7 +232,7 @@ class TesseractProvider(OCRProvider):
                 'processing_time': time.time() - start_time,
                 'error_message': f'Tesseract timeout después de {self.config["timeout"]}s'
             }
-        
+
         except Exception as e:
             return {
                 'success': False,
@@ -229,16 +241,6 @@ class TesseractProvider(OCRProvider):
                 'processing_time': time.time() - start_time,
                 'error_message': f'Error en Tesseract: {str(e)}'
             }
-        
-        finally:
-            # Limpiar archivos temporales
-            if self.config['temp_cleanup']:
-                for temp_file in temp_files:
-                    try:
-                        if os.path.exists(temp_file):
-                            os.unlink(temp_file)
-                    except Exception as e:
-                        logger.warning(f"No se pudo limpiar archivo temporal {temp_file}: {e}")
     
     def _prepare_image_for_tesseract(self, image: Image.Image) -> Image.Image:
         """Preparar imagen específicamente para Tesseract"""
@@ -261,6 +263,48 @@ class TesseractProvider(OCRProvider):
         
         return image
     
+    def _parse_tsv_output(self, tsv_data: str) -> tuple:
+        """Reconstruir texto y confianza promedio desde la salida TSV de Tesseract"""
+
+        lines = []
+        current_key = None
+        current_words = []
+        confidences = []
+
+        for row in tsv_data.split('\n')[1:]:  # Saltar cabecera
+            fields = row.split('\t')
+            if len(fields) < 12 or fields[0] != '5':  # Nivel 5 = palabra
+                continue
+
+            word = fields[11].strip()
+            if not word:
+                continue
+
+            # Agrupar palabras por (página, bloque, párrafo, línea)
+            key = (fields[1], fields[2], fields[3], fields[4])
+            if key != current_key:
+                if current_words:
+                    lines.append(' '.join(current_words))
+                current_key = key
+                current_words = []
+
+            current_words.append(word)
+
+            try:
+                conf = float(fields[10])
+                if conf >= 0:
+                    confidences.append(conf)
+            except ValueError:
+                pass
+
+        if current_words:
+            lines.append(' '.join(current_words))
+
+        text = '\n'.join(lines).strip()
+        confidence = sum(confidences) / len(confidences) if confidences else None
+
+        return text, confidence
+
     def _estimate_confidence(self, text: str, image: Image.Image) -> float:
         """Estimar confianza del resultado Tesseract"""
         
@@ -283,8 +327,9 @@ class TesseractProvider(OCRProvider):
         if 0.1 <= char_density <= 10:
             confidence += 10
         
-        # Penalizar caracteres extraños
-        weird_chars = sum(1 for c in text if ord(c) > 127 and c not in 'áéíóúüñÁÉÍÓÚÜÑ¿¡')
+        # Penalizar caracteres extraños (conteo en C vía regex compilada,
+        # no bucle Python por carácter)
+        weird_chars = len(_WEIRD_CHARS_RE.findall(text))
         if weird_chars > len(text) * 0.2:
             confidence -= 20
         